@@ -1,6 +1,12 @@
+import argparse
+import hashlib
 import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache, partial
 import backtrader as bt
+import numpy as np
 
 from strategies.general_strategy import GeneralStrategy
 from strategies.cross_method import CrossMethod
@@ -9,9 +15,89 @@ from strategies.golden_and_death_cross import GoldenDeathCross
 DATA_FOLDER = 'data'
 LOGS_FOLDER = 'logs'
 LOGS_FILE = 'operations.log'
+CACHE_FOLDER = 'cache' # Resultados de simulaciones ya realizadas en los barridos de parámetros
 CASH = 100000.0
 START_DATE = datetime(2021, 1, 1)
 END_DATE = datetime(2022, 1, 1)
+PARALLEL_BY_ASSET = False # Si es verdadero, cada activo se simula con su propio cerebro (y su propio capital) en un proceso aparte
+SWEEP_SHORT_PERIODS = range(5, 55, 5)       # Períodos de la SMA corta que se prueban al barrer parámetros de GoldenDeathCross
+SWEEP_LONG_PERIODS = range(20, 210, 10)     # Períodos de la SMA larga que se prueban al barrer parámetros de GoldenDeathCross
+
+@lru_cache(maxsize=32)
+def file_digest(file_path, mtime):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo, guardándolo en caché mientras no se modifique.
+
+    Args:
+        file_path (str): Ruta al archivo.
+        mtime (float): Fecha de modificación del archivo, solo para invalidar la caché cuando cambia.
+
+    Returns:
+        str: Hash del archivo en hexadecimal.
+    """
+    with open(file_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+def code_digest():
+    """
+    Calcula un hash del código que determina los resultados: este archivo (la carga de los datos y la configuración de cada
+    simulación) y todas las estrategias, junto con la versión de Backtrader. Así los resultados guardados dejan de usarse si
+    cambia la lógica de alguno (y no solo los parámetros).
+
+    Returns:
+        str: Hash del código en hexadecimal.
+    """
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'strategies')
+    file_paths = [os.path.abspath(__file__), *sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.py'))]
+    digests = [file_digest(file_path, os.path.getmtime(file_path)) for file_path in file_paths]
+
+    return hashlib.sha256(''.join([bt.__version__, *digests]).encode()).hexdigest()
+
+def run_cached(compute, *key_parts, cache_folder=CACHE_FOLDER):
+    """
+    Devuelve el resultado guardado en disco para la configuración indicada, o lo calcula y lo guarda si no existe. La clave es el
+    hash SHA-256 de las partes recibidas junto con el del código (ver code_digest), así que una configuración distinta (o una
+    versión distinta del código) usa otro archivo. Para invalidar la caché basta con borrar la carpeta.
+
+    Args:
+        compute (Callable[[], object]): Función sin argumentos que realiza la simulación. Su resultado debe poder serializarse con pickle.
+        *key_parts: Todo lo que determina el resultado (estrategia, parámetros, hash de los datos, fechas, capital, etc).
+        cache_folder (str): Carpeta donde se guardan los resultados.
+
+    Returns:
+        object: Resultado de la simulación, calculado o leído de la caché.
+    """
+    key = hashlib.sha256(repr((code_digest(), *key_parts)).encode()).hexdigest()
+    cache_path = os.path.join(cache_folder, f'{key}.pkl')
+
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as cache_file:
+            return pickle.load(cache_file)
+
+    result = compute()
+    os.makedirs(cache_folder, exist_ok=True)
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as cache_file:
+        pickle.dump(result, cache_file)
+    os.replace(temp_path, cache_path) # Se escribe en un archivo temporal y se renombra, para que otro proceso nunca lea un resultado a medio escribir
+
+    return result
+
+def create_datafeed(file_path):
+    """
+    Crea el datafeed de un archivo CSV para el rango de fechas de la simulación.
+
+    Args:
+        file_path (str): Ruta al archivo CSV del activo.
+
+    Returns:
+        bt.feeds.YahooFinanceCSVData: Datafeed del activo.
+    """
+    return bt.feeds.YahooFinanceCSVData(
+        dataname=file_path,
+        fromdate=START_DATE,
+        todate=END_DATE
+    )
 
 def load_datafeeds(data_folder):
     """
@@ -21,70 +107,73 @@ def load_datafeeds(data_folder):
         data_folder (str): Ruta a la carpeta que contiene los archivos CSV de los datafeeds.
 
     Returns:
-        list: Lista de objetos YahooFinanceCSVData (se usa este ya que están previamente descargados, sino se usaría YahooFinanceData).
+        list: Lista de tuplas (YahooFinanceCSVData, nombre del activo), con los CSV de Yahoo Finance previamente descargados (sino se usaría YahooFinanceData).
     """
     datafeeds = []
     files = [f for f in os.listdir(data_folder) if f.endswith('.csv')]
 
     for file in files:
-        datafeed = bt.feeds.YahooFinanceCSVData(
-            dataname=os.path.join(data_folder, file),
-            fromdate=START_DATE,
-            todate=END_DATE
-        )
+        datafeed = create_datafeed(os.path.join(data_folder, file))
         datafeeds.append((datafeed, file.split('.')[0]))
-    
+
     return datafeeds
 
-def create_logs_file():
+def create_logs_file(log_file_path=os.path.join(LOGS_FOLDER, LOGS_FILE)):
     """
-    Crea la carpeta de logs y el archivo operations.log si no existen.
+    Crea la carpeta del archivo de logs y el archivo si no existen.
     Vacía el archivo si ya existe.
 
+    Args:
+        log_file_path (str): Ruta al archivo de logs. Por defecto es logs/operations.log.
+
     Returns:
         str: Ruta al archivo de logs.
     """
-    if not os.path.exists(LOGS_FOLDER):
-        os.makedirs(LOGS_FOLDER)
-    log_file_path = os.path.join(LOGS_FOLDER, LOGS_FILE)
+    os.makedirs(os.path.dirname(log_file_path) or '.', exist_ok=True) # Con exist_ok no falla si otro proceso la creó en paralelo
     with open(log_file_path, 'w') as log_file:
         log_file.truncate(0)
-    
+
     return log_file_path
 
-def create_cerebro(log_file_path):
+def create_cerebro(log_file_path, datafeeds):
     """
     A partir de esta función se crea y configura el motor cerebro de Backtrader.
 
     Args:
         log_file_path (str): Ruta al archivo de logs.
+        datafeeds (list): Lista de tuplas (datafeed, nombre del activo) a simular.
 
     Returns:
         cerebro (bt.Cerebro): Motor cerebro configurado con datafeeds y estrategias.
     """
     cerebro = bt.Cerebro()
 
-    datafeeds = load_datafeeds(DATA_FOLDER)
-
     for datafeed, name in datafeeds:
         cerebro.adddata(datafeed, name=name)
 
-    GeneralStrategy.log_file_path = log_file_path
+    GeneralStrategy.pending_operation_cents = 0 # Los fondos pendientes son del broker de cada cerebro, y un mismo proceso puede simular varios
     #GeneralStrategy.show_generated_order_log = True #Descomentar si se quiere ver también los logs de las órdenes generadas pero en proceso
 
-    cerebro.addstrategy(CrossMethod)
-    cerebro.addstrategy(CrossMethod, period=30)
-    cerebro.addstrategy(GoldenDeathCross)
+    cerebro.addstrategy(CrossMethod, log_file_path=log_file_path)
+    cerebro.addstrategy(CrossMethod, period=30, log_file_path=log_file_path)
+    cerebro.addstrategy(GoldenDeathCross, log_file_path=log_file_path)
 
     cerebro.broker.setcash(CASH)
 
     return cerebro
 
-if __name__ == '__main__':
+def run_backtest(log_file_path, datafeeds):
+    """
+    Ejecuta la simulación de los datafeeds indicados, registrando en el archivo de logs el valor de inicio y de fin del portafolio.
 
-    log_file_path = create_logs_file()
+    Args:
+        log_file_path (str): Ruta al archivo de logs.
+        datafeeds (list): Lista de tuplas (datafeed, nombre del activo) a simular.
 
-    cerebro = create_cerebro(log_file_path)
+    Returns:
+        float: Valor final del portafolio.
+    """
+    cerebro = create_cerebro(log_file_path, datafeeds)
 
     initial_value = cerebro.broker.getvalue()
 
@@ -94,6 +183,199 @@ if __name__ == '__main__':
     cerebro.run()
 
     final_value = cerebro.broker.getvalue()
-    
+
     with open(log_file_path, 'a') as log_file:
         log_file.write(f'VALOR DE FIN DEL PORTAFOLIO: {final_value:.2f}\n')
+
+    return final_value
+
+def run_asset_backtest(file_path, logs_folder):
+    """
+    Simula un único activo con su propio cerebro, escribiendo sus operaciones en operations_<ACTIVO>.log dentro de la carpeta
+    de logs. Está pensada para ejecutarse en un proceso aparte, por lo que recibe solo la ruta del archivo (los datafeeds no se
+    pueden serializar).
+
+    Args:
+        file_path (str): Ruta al archivo CSV del activo.
+        logs_folder (str): Ruta a la carpeta donde se guarda el log del activo.
+
+    Returns:
+        tuple[str, float]: Nombre del activo y valor final de su portafolio.
+    """
+    name = os.path.basename(file_path).split('.')[0]
+    log_file_path = create_logs_file(os.path.join(logs_folder, f'operations_{name}.log'))
+    datafeed = create_datafeed(file_path)
+
+    return name, run_backtest(log_file_path, [(datafeed, name)])
+
+def run_backtests_by_asset(data_folder, logs_folder):
+    """
+    Simula cada activo de la carpeta en paralelo, con un proceso por activo. Como cada simulación tiene su propio broker, los
+    activos no comparten el capital, por lo que el resultado no es equivalente al de simularlos todos juntos.
+
+    Args:
+        data_folder (str): Ruta a la carpeta que contiene los archivos CSV de los datafeeds.
+        logs_folder (str): Ruta a la carpeta donde se guardan los logs de cada activo.
+
+    Returns:
+        dict[str, float]: Valor final del portafolio de cada activo.
+    """
+    file_paths = [os.path.join(data_folder, f) for f in os.listdir(data_folder) if f.endswith('.csv')]
+    if not file_paths:
+        return {}   # ProcessPoolExecutor no acepta 0 procesos
+
+    with ProcessPoolExecutor(max_workers=min(len(file_paths), os.cpu_count() or 1)) as executor: # Se usa concurrent.futures en lugar de multiprocessing.Pool por compatibilidad con Windows
+        return dict(executor.map(partial(run_asset_backtest, logs_folder=logs_folder), file_paths))
+
+def run_parameter_backtest(periods, file_path):
+    """
+    Simula GoldenDeathCross con un par de períodos sobre un único activo, con su propio cerebro y sin registrar las operaciones
+    (así los procesos no compiten por un mismo archivo de logs). Está pensada para ejecutarse en un proceso aparte. Si ya se
+    simuló la misma combinación sobre el mismo archivo, se usa el resultado guardado en la carpeta de caché.
+
+    Args:
+        periods (tuple[int, int]): Períodos de la SMA corta y de la SMA larga.
+        file_path (str): Ruta al archivo CSV del activo.
+
+    Returns:
+        tuple[tuple[int, int], float]: Períodos simulados y valor final del portafolio.
+    """
+    short_period, long_period = periods
+
+    def compute():
+        cerebro = bt.Cerebro()
+        cerebro.adddata(create_datafeed(file_path), name=os.path.basename(file_path).split('.')[0])
+
+        GeneralStrategy.pending_operation_cents = 0 # Cada proceso simula varias combinaciones, una después de la otra
+        cerebro.addstrategy(GoldenDeathCross, short_period=short_period, long_period=long_period, log_file_path=None)
+        cerebro.broker.setcash(CASH)
+        cerebro.run()
+
+        return cerebro.broker.getvalue()
+
+    data_digest = file_digest(file_path, os.path.getmtime(file_path))
+    return periods, run_cached(compute, GoldenDeathCross.__name__, short_period, long_period, data_digest, START_DATE, END_DATE, CASH)
+
+def load_prices(file_path):
+    """
+    Carga los precios de apertura y de cierre de un activo en el rango de fechas de la simulación, con el mismo datafeed que la
+    simulación normal (así los ajustes y redondeos son los mismos). El datafeed se precarga con un cerebro sin estrategias.
+
+    Args:
+        file_path (str): Ruta al archivo CSV del activo.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Precios de apertura y de cierre de cada vela.
+    """
+    datafeed = create_datafeed(file_path)
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(datafeed)
+    cerebro.run()
+
+    return np.asarray(datafeed.open.array), np.asarray(datafeed.close.array)
+
+def create_param_grid(short_periods, long_periods):
+    """
+    Arma todas las combinaciones de períodos en las que la SMA corta es menor que la larga.
+
+    Args:
+        short_periods (Iterable[int]): Períodos de la SMA corta a probar.
+        long_periods (Iterable[int]): Períodos de la SMA larga a probar.
+
+    Returns:
+        list[tuple[int, int]]: Pares de períodos (corto, largo).
+    """
+    return [(short_period, long_period) for short_period in short_periods for long_period in long_periods if short_period < long_period]
+
+def run_parameter_sweep(file_path, short_periods=SWEEP_SHORT_PERIODS, long_periods=SWEEP_LONG_PERIODS):
+    """
+    Simula GoldenDeathCross sobre un activo con todas las combinaciones de períodos en las que la SMA corta es menor que la
+    larga, con GoldenDeathCross.fast_backtest (sin cerebro). Su resultado coincide con el de cerebro para la estrategia
+    operando sola sobre el activo, lo cual puede comprobarse con run_parameter_sweep_cerebro.
+
+    Args:
+        file_path (str): Ruta al archivo CSV del activo.
+        short_periods (Iterable[int]): Períodos de la SMA corta a probar.
+        long_periods (Iterable[int]): Períodos de la SMA larga a probar.
+
+    Returns:
+        dict[tuple[int, int], float]: Valor final del portafolio para cada par de períodos (corto, largo).
+    """
+    param_grid = create_param_grid(short_periods, long_periods)
+    if not param_grid:
+        return {}
+
+    opens, closes = load_prices(file_path)
+    return {(short_period, long_period): GoldenDeathCross.fast_backtest(opens, closes, short_period, long_period, cash=CASH)[0]
+            for short_period, long_period in param_grid}
+
+def run_parameter_sweep_cerebro(file_path, short_periods=SWEEP_SHORT_PERIODS, long_periods=SWEEP_LONG_PERIODS):
+    """
+    Igual que run_parameter_sweep, pero simulando cada combinación con su propio cerebro, en paralelo con un proceso por núcleo.
+    Es mucho más lento, así que solo se usa para validar los resultados de fast_backtest.
+
+    Args:
+        file_path (str): Ruta al archivo CSV del activo.
+        short_periods (Iterable[int]): Períodos de la SMA corta a probar.
+        long_periods (Iterable[int]): Períodos de la SMA larga a probar.
+
+    Returns:
+        dict[tuple[int, int], float]: Valor final del portafolio para cada par de períodos (corto, largo).
+    """
+    param_grid = create_param_grid(short_periods, long_periods)
+    if not param_grid:
+        return {}   # ProcessPoolExecutor no acepta 0 procesos
+
+    with ProcessPoolExecutor(max_workers=min(len(param_grid), os.cpu_count() or 1)) as executor:
+        return dict(executor.map(partial(run_parameter_backtest, file_path=file_path), param_grid))
+
+def parse_args():
+    """
+    Lee los argumentos de la línea de comandos.
+
+    Returns:
+        argparse.Namespace: Argumentos recibidos, con log_file como ruta al archivo de logs (por defecto logs/operations.log), sweep
+            con el activo sobre el que barrer parámetros (None si no se pidió) y validate_sweep indicando si validar el barrido con cerebro.
+    """
+    parser = argparse.ArgumentParser(description='Ejecuta el bot de trading sobre los datafeeds de la carpeta de datos.')
+    parser.add_argument('--log-file', default=os.path.join(LOGS_FOLDER, LOGS_FILE), help='Ruta al archivo de logs (por defecto logs/operations.log).')
+    parser.add_argument('--sweep', metavar='ACTIVO', help='En lugar de la simulación normal, barre los períodos de GoldenDeathCross sobre el activo indicado (por ejemplo AAPL).')
+    parser.add_argument('--validate-sweep', action='store_true', help='Junto con --sweep, vuelve a simular cada combinación con cerebro y registra las que no coinciden.')
+    args = parser.parse_args()
+
+    if args.validate_sweep and not args.sweep:
+        parser.error('--validate-sweep solo puede usarse junto con --sweep')
+    if args.sweep and not os.path.isfile(os.path.join(DATA_FOLDER, f'{args.sweep}.csv')):
+        parser.error(f'no existe el archivo de datos del activo {args.sweep} en la carpeta {DATA_FOLDER}')
+
+    return args
+
+if __name__ == '__main__':
+
+    args = parse_args()
+    log_file_path = create_logs_file(args.log_file)
+
+    if args.sweep:
+        file_path = os.path.join(DATA_FOLDER, f'{args.sweep}.csv')
+        final_values = run_parameter_sweep(file_path)
+
+        with open(log_file_path, 'a') as log_file:
+            for (short_period, long_period), final_value in sorted(final_values.items(), key=lambda item: item[1], reverse=True):
+                log_file.write(f'GOLDEN/DEATH CROSS SOBRE {args.sweep} CON PERIODO CORTO DE {short_period} Y PERIODO LARGO DE {long_period} '
+                               f'(CAPITAL INICIAL {CASH:.2f}): {final_value:.2f}\n')
+
+            if args.validate_sweep:
+                cerebro_values = run_parameter_sweep_cerebro(file_path)
+                mismatches = [periods for periods, final_value in final_values.items() if abs(final_value - cerebro_values[periods]) >= 0.005]
+                for short_period, long_period in mismatches:
+                    log_file.write(f'DIFERENCIA CON CEREBRO CON PERIODO CORTO DE {short_period} Y PERIODO LARGO DE {long_period}: '
+                                   f'{final_values[(short_period, long_period)]:.2f} CONTRA {cerebro_values[(short_period, long_period)]:.2f}\n')
+                log_file.write(f'VALIDACION CON CEREBRO: {len(final_values) - len(mismatches)} DE {len(final_values)} COMBINACIONES COINCIDEN\n')
+    elif PARALLEL_BY_ASSET:
+        final_values = run_backtests_by_asset(DATA_FOLDER, os.path.dirname(log_file_path) or '.')
+
+        with open(log_file_path, 'a') as log_file:
+            for name, final_value in final_values.items():
+                log_file.write(f'VALOR DE FIN DEL PORTAFOLIO DE {name} (CAPITAL INICIAL {CASH:.2f}): {final_value:.2f}\n')
+    else:
+        run_backtest(log_file_path, load_datafeeds(DATA_FOLDER))
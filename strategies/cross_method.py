@@ -1,5 +1,5 @@
-import backtrader as bt
 from strategies.general_strategy import GeneralStrategy
+from strategies.kernels import compute_price_signal, to_cents
 
 class CrossMethod(GeneralStrategy):        
     """
@@ -7,29 +7,32 @@ class CrossMethod(GeneralStrategy):
     para generar señales de compra y venta cuando el precio de cierre cruza la SMA.
 
     Atributos:
-        smas (dict[bt.feeds.Data, bt.indicators.SimpleMovingAverage]): Indicadores SMA utilizados para cada datafeed.
+        signals (list[np.ndarray]): Para cada datafeed (en el mismo orden que self.datas), la posición del precio de cierre respecto de la SMA en cada vela:
+            1 si está por encima, -1 si está por debajo y 0 si son iguales o la SMA todavía no tiene la ventana completa.
 
     Args:
         period (int): El número de períodos para calcular la SMA, este posee un valor por defecto de 10.
     """
 
+    __slots__ = ('signals',)
+
     params = (
         ('period', 10),
     )
 
     def __init__(self):
         """
-        Para inicializar la estrategia y calcula las SMAs utilizando el período proporcionado junto con el precio de cierre
-        de los datos.
+        Para inicializar la estrategia y obtener las SMAs utilizando el período proporcionado junto con el precio de cierre
+        de los datos. Como las SMAs están precalculadas para toda la serie, la comparación con el precio de cierre también se
+        hace una sola vez y de forma vectorizada, y en cada paso solo se consulta la vela actual.
         """
         super().__init__()
 
-        self.smas = {}
-
-        for data in self.datas:
-            self.smas[data._name] = bt.indicators.SimpleMovingAverage(data.close, period=self.params.period)
+        self.warmup_period = self.params.period
+        self.signals = [compute_price_signal(to_cents(data.close.array), self.get_sma_sums(data, self.params.period), self.params.period)
+                        for data in self.datas] # Lista en lugar de diccionario para indexar por posición, sin hashear el nombre del activo
 
-    def conditions_buy(self, data) -> bool:
+    def conditions_buy(self, data, data_index) -> bool:
         """
         Método que define las condiciones para ejecutar una orden de compra (implementación del método de la clase genérica de estrategia).
 
@@ -37,13 +40,14 @@ class CrossMethod(GeneralStrategy):
 
         Args:
             data (bt.feeds.YahooFinanceCSVData): Objeto de datos de Yahoo Finance con la información del activo correspondiente.
+            data_index (int): Posición del datafeed en self.datas.
 
         Returns:
             bool: Verdadero si el precio de cierre es mayor que la SMA, lo que indica una señal de compra (por posible tendencia alcista).
         """
-        return data.close[0] > self.smas[data._name][0]
+        return self.signals[data_index][len(data) - 1] > 0
 
-    def conditions_sell(self, data) -> bool:
+    def conditions_sell(self, data, data_index) -> bool:
         """
         Método que define las condiciones para ejecutar una orden de venta (implementación del método de la clase genérica de estrategia).
 
@@ -51,11 +55,12 @@ class CrossMethod(GeneralStrategy):
 
         Args:
             data (bt.feeds.YahooFinanceCSVData): Objeto de datos de Yahoo Finance con la información del activo correspondiente.
+            data_index (int): Posición del datafeed en self.datas.
 
         Returns:
             bool: Verdadero si el precio de cierre es menor que la SMA, lo que indica una señal de venta (ya que indica posible tendencia bajista).
         """
-        return data.close[0] < self.smas[data._name][0]
+        return self.signals[data_index][len(data) - 1] < 0
     
     def __str__(self) -> str:
         """
@@ -1,4 +1,32 @@
 import backtrader as bt
+import numpy as np
+from strategies.kernels import compute_sma_sums, to_cents
+from strategies.log_writer import LogWriter
+
+class BrokerValueCache:
+    """
+    Valor del portafolio memorizado por paso. El broker lo calcula recorriendo todas las posiciones, pero durante un mismo
+    paso no cambia (las órdenes se ejecutan entre velas), así que se le consulta una sola vez por paso aunque se cierren
+    varias operaciones en él.
+
+    Atributos:
+        broker (bt.brokers.BackBroker): Broker del cerebro.
+        bar (int): Paso para el cual se consultó value.
+        value (float): Valor del portafolio en ese paso.
+    """
+
+    __slots__ = ('broker', 'bar', 'value')
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.bar = -1
+        self.value = 0.0
+
+    def get_value(self, bar) -> float:
+        if bar != self.bar:
+            self.bar = bar
+            self.value = self.broker.get_value()
+        return self.value
 
 class GeneralStrategy(bt.Strategy):
     """
@@ -6,23 +34,42 @@ class GeneralStrategy(bt.Strategy):
     Permite gestionar compras y ventas automáticas basadas en condiciones definidas.
 
     Atributos de clase:
-        log_file_path (str): Ruta al archivo de log. Por defecto es 'logs/operations.log'.
         show_generated_order_log (bool): Indica si mostrar o no el log de órdenes generadas en el next, pero que están en proceso (ni ejecutadas, ni canceladas, etc). Por defecto no se muestra.
-        pending_operation_funds (int): Monto de dinero pendiente de operaciones, para evitar que una operación de compra utilice fondos de otra operación de compra que todavía no se ha completado.
+        pending_operation_cents (int): Monto de dinero pendiente de operaciones (en centavos), para evitar que una operación de compra utilice fondos de otra operación de compra que todavía no se ha completado. Se lleva en enteros para que las reservas y liberaciones se cancelen exactamente, sin acumular error de redondeo.
+        not_completed_statuses (frozenset[int]): Estados de las órdenes que terminaron sin completarse (canceladas, por margen insuficiente o rechazadas).
+        sma_sums_cache (dict[tuple[str, int], tuple[array, np.ndarray]]): SMAs ya calculadas (como sumas de la ventana en centavos) por (nombre del activo, período), compartidas entre todas las estrategias para no repetir el cálculo cuando coinciden los períodos.
 
 
     Atributos:
-        log_file (file): Archivo de log para registrar las operaciones realizadas, se guarda en la carpeta logs del proyecto.
-        assets_registry (dict): Registro de activos y sus respectivas cantidades para la estrategia, para saber cuántos activos se tienen en cartera disponibles para vender con la estrategia.
+        log_file (LogWriter): Archivo de log para registrar las operaciones realizadas, se guarda en la carpeta logs del proyecto.
+        assets_registry (list[int]): Registro de activos y sus respectivas cantidades para la estrategia (en el mismo orden que self.datas), para saber cuántos activos se tienen en cartera disponibles para vender con la estrategia.
+        data_indexes (dict[str, int]): Posición de cada activo en self.datas, para ubicarlo en el assets_registry a partir de las órdenes.
+        investment_fraction (float): Fracción del portafolio a invertir en cada activo, tomada del parámetro del mismo nombre.
+        investment_percentage (str): Porcentaje de la cartera que se invierte en cada compra, ya formateado para los logs.
+        broker_cash_cents (int): Efectivo disponible en el broker al comienzo del paso actual, en centavos para compararlo con los fondos reservados sin errores de redondeo.
+        broker_value (float): Valor del portafolio al comienzo del paso actual.
+        log_date_bar (int): Paso para el cual se calculó log_date_text.
+        log_date_text (str): Fecha del paso actual en formato ISO, para no convertirla en cada registro del mismo paso.
+        warmup_period (int): Cantidad de velas que necesita la estrategia para que sus indicadores estén completos (las clases hijas la ajustan según sus períodos). Hasta que todos los datafeeds la alcanzan no se evalúan las condiciones.
+        warming_up_datas (list[bt.feeds.YahooFinanceCSVData]): Datafeeds que todavía no tienen suficientes velas. Mientras quede alguno no se evalúan las condiciones.
+        broker_value_cache (BrokerValueCache): Valor del portafolio consultado al broker como mucho una vez por paso, para los logs de operaciones cerradas.
+        strategy_label (str): Descripción de la estrategia (su __str__) para los logs de órdenes ejecutadas, armada una sola vez al comenzar la simulación.
     Args:
         investment_fraction (float): Fracción del portafolio a invertir en cada activo. Por defecto es 0.1, o sea el 10% del portafolio.
+        log_file_path (str): Ruta al archivo de log. Si es None no se registran las operaciones.
     """
 
-    log_file_path = 'logs/operations.log'
-
     show_generated_order_log = False
 
-    pending_operation_funds = 0
+    pending_operation_cents = 0
+
+    not_completed_statuses = frozenset((bt.Order.Canceled, bt.Order.Margin, bt.Order.Rejected))
+
+    sma_sums_cache = {}
+
+    __slots__ = ('assets_registry', 'data_indexes', 'log_file', 'warmup_period', 'warming_up_datas',                     # Backtrader ya le da un __dict__ a la estrategia, pero los atributos
+                 'investment_fraction', 'investment_percentage', 'broker_cash_cents', 'broker_value', 'log_date_bar',    # declarados acá se guardan en posiciones fijas de la instancia y se
+                 'log_date_text', 'broker_value_cache', 'strategy_label')                                                # leen sin buscarlos en el diccionario en cada paso
     
     params = (
         ('investment_fraction', 0.1),
@@ -34,14 +81,56 @@ class GeneralStrategy(bt.Strategy):
         Inicializa la estrategia y el registro de activos con 0 unidades de cada uno. Además, abre el archivo de log para registrar
         las operaciones.
         """
-        self.assets_registry = {}
-        for data in self.datas:
-            self.assets_registry[data._name] = 0    # Si bien podria ser un atributo de clase, cada instancia de estrategia solo deberia conocer sus
-                                                    # propias cantidades de activos. No hay problema con esto porque no tendria sentido pasar al cerebro dos estrategias del mismo tipo con iguales indicadores, por lo que cada una es diferente y no se mezclan.
+        self.assets_registry = [0] * len(self.datas)    # Si bien podria ser un atributo de clase, cada instancia de estrategia solo deberia conocer sus
+                                                        # propias cantidades de activos. No hay problema con esto porque no tendria sentido pasar al cerebro dos estrategias del mismo tipo con iguales indicadores, por lo que cada una es diferente y no se mezclan.
+        self.data_indexes = {data._name: data_index for data_index, data in enumerate(self.datas)}
+
+        self.log_file = LogWriter.open(self.params.log_file_path) if self.params.log_file_path else None  # El log es compartido por todas las estrategias que escriben en la misma ruta,
+                                                                                                            # lo cual es crucial ya que sino pueden ocurrir problemas en el orden de los registros,
+                                                                                                            # y se escribe en bloques en lugar de hacer una escritura por cada operación.
+                                                                                                            # Sin ruta no se registra nada (por ejemplo al barrer parámetros)
+
+        self.warmup_period = 1
+        self.warming_up_datas = list(self.datas)
+
+        self.investment_fraction = self.params.investment_fraction   # Se copia a un atributo propio para no pasar por los params de Backtrader en cada compra posible
+        self.investment_percentage = f'{self.investment_fraction * 100:.2f}%'    # Es constante durante toda la simulación, así que se formatea una sola vez
 
-        self.log_file = open(self.params.log_file_path, 'a', buffering=1)   # A partir de setear el buffering en 1 se asegura que el archivo se
-                                                                            # escriba en cada operación en orden, lo cual es crucial ya que sino pueden ocurrir problemas en el orden
-                                                                            # de los registros (y es más eficiente al no hacer un flush en cada escritura)
+        self.broker_cash_cents = 0
+        self.broker_value = 0.0
+
+        self.log_date_bar = -1
+        self.log_date_text = ''
+
+        self.broker_value_cache = BrokerValueCache(self.broker)
+        self.strategy_label = ''
+
+    def get_sma_sums(self, data, period) -> np.ndarray:
+        """
+        Devuelve la SMA del período indicado para un datafeed, expresada como la suma en centavos de la ventana de cada vela
+        (la SMA multiplicada por el período), para que las comparaciones sean exactas. Como los datafeeds se precargan completos
+        antes de crear las estrategias (comportamiento por defecto de cerebro), se calcula una sola vez para toda la serie y se
+        guarda en la caché de la clase, por lo que las estrategias que usan el mismo período sobre el mismo activo la comparten.
+
+        Args:
+            data (bt.feeds.YahooFinanceCSVData): Objeto de datos de Yahoo Finance con la información del activo correspondiente.
+            period (int): El número de períodos de la SMA.
+
+        Returns:
+            np.ndarray: Suma de la ventana de cada vela del datafeed en centavos (la vela actual es la posición len(data) - 1), con 0 mientras la ventana no está completa.
+
+        Raises:
+            ValueError: Si el cerebro no precarga los datafeeds, porque entonces todavía no hay precios para calcular la SMA.
+        """
+        if not self.cerebro.p.preload:
+            raise ValueError(f'{type(self).__name__} necesita los datafeeds precargados para calcular las SMAs: ejecutar el cerebro con preload=True')
+
+        key = (data._name, period)
+        cached = GeneralStrategy.sma_sums_cache.get(key)
+        if cached is None or cached[0] is not data.close.array:  # Si es otro datafeed con el mismo nombre (por ejemplo de otra corrida) se recalcula
+            cached = (data.close.array, compute_sma_sums(to_cents(data.close.array), period))
+            GeneralStrategy.sma_sums_cache[key] = cached
+        return cached[1]
         
     def add_log_entry(self, txt, dt=None):
         """
@@ -51,55 +140,107 @@ class GeneralStrategy(bt.Strategy):
             txt (str): Mensaje a registrar.
             dt (datetime): Fecha asociada al mensaje.
         """
-        if dt is None:
-            dt = self.datas[0].datetime.date(0) # Para que si no se pasa una fecha, se utilice la del candlestick actual del primer datafeed
+        if dt is not None:
+            date_text = dt.isoformat()
+        else:   # Para que si no se pasa una fecha, se utilice la del candlestick actual del primer datafeed, convirtiéndola una sola vez por paso
+            bar = len(self)
+            if bar != self.log_date_bar:
+                self.log_date_bar = bar
+                self.log_date_text = self.datas[0].datetime.date(0).isoformat()
+            date_text = self.log_date_text
         if self.log_file:
-            self.log_file.write(f"{dt.isoformat()}, {txt}" + '\n')
+            self.log_file.write(f"{date_text}, {txt}\n")
+
+    def start(self):
+        """
+        Backtrader llama a este método una vez antes del primer paso, cuando ya terminaron los __init__ de las clases hijas, por
+        lo que recién acá se pueden leer sus parámetros para armar la descripción de la estrategia. No cambia durante la
+        simulación, así que no se vuelve a formatear en cada orden ejecutada.
+        """
+        self.strategy_label = str(self)
+
+    def stop(self):
+        """
+        Al finalizar la simulación libera el archivo de log, escribiendo las entradas que hayan quedado pendientes.
+        """
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
         
-    def get_purchase_vol(self, data) -> int:
+    def get_purchase_vol(self, price_cents, money_to_invest_cents) -> int:
         """
-        Este método calcula el tamaño de la posición a comprar basado en la fracción del portafolio que se puede utilizar.
+        Este método calcula el tamaño de la posición a comprar basado en la fracción del portafolio que se puede utilizar. Que
+        los fondos disponibles alcancen ya se verificó antes con has_funds_for. Como los precios tienen 2 decimales, en
+        centavos la división entera es exacta.
 
         Args:
-            data (bt.feeds.YahooFinanceCSVData): Objeto de datos de Yahoo Finance con la información del activo correspondiente.
+            price_cents (int): Precio de cierre del activo en centavos.
+            money_to_invest_cents (int): Dinero a invertir en la compra, en centavos.
 
         Returns:
             int: Tamaño de la posición a comprar.
         """
-        total_value = self.broker.getvalue()
-        money_to_invest = total_value * self.params.investment_fraction
-        available_funds = self.broker.get_cash() - GeneralStrategy.pending_operation_funds
+        return money_to_invest_cents // price_cents
 
-        if money_to_invest <= available_funds:
-            size = int(money_to_invest / data.close[0])
-            return size
-        
-        return 0 # Si bien podría quitarse el if y retornar directamente el resultado de la división porque el money_to_invest en este contexto no debiera ser nunca negativo, no está de más el chequeo
+    def has_funds_for(self, money_to_invest_cents) -> bool:
+        """
+        Verifica si el efectivo que no está reservado por órdenes de compra pendientes alcanza para invertir el monto indicado.
+        Si no alcanza no se compra (tampoco una cantidad menor con lo que queda).
+
+        Args:
+            money_to_invest_cents (int): Dinero a invertir en la compra, en centavos.
+
+        Returns:
+            bool: Verdadero si los fondos disponibles alcanzan.
+        """
+        return money_to_invest_cents <= self.broker_cash_cents - GeneralStrategy.pending_operation_cents
     
-    def conditions_buy(self, data) -> bool:
+    def notify_cashvalue(self, cash, value):
+        """
+        Backtrader llama a este método en cada paso, justo antes del next, con el efectivo y el valor del portafolio. Se guardan
+        para no volver a consultarlos al broker (que recorre todas las posiciones para valuarlas) por cada compra posible, ya
+        que no cambian durante el paso: las órdenes se ejecutan recién en el siguiente.
+
+        Args:
+            cash (float): Efectivo disponible en el broker.
+            value (float): Valor del portafolio.
+        """
+        self.broker_cash_cents = round(cash * 100)
+        self.broker_value = value
+
+    def conditions_buy(self, data, data_index) -> bool:
         """
         Método que define las condiciones para ejecutar una orden de compra (debe ser implementado por las clases hijas).
 
         Args:
             data (bt.feeds.YahooFinanceCSVData): Objeto de datos de Yahoo Finance con la información del activo correspondiente.
+            data_index (int): Posición del datafeed en self.datas.
 
         Returns:
             bool: Verdadero si se cumplen las condiciones de compra.
         """
         return True
     
-    def conditions_sell(self, data) -> bool:
+    def conditions_sell(self, data, data_index) -> bool:
         """
         Método que define las condiciones para ejecutar una orden de venta (debe ser implementado por las clases hijas).
 
         Args:
             data (bt.feeds.YahooFinanceCSVData): Objeto de datos de Yahoo Finance con la información del activo correspondiente.
+            data_index (int): Posición del datafeed en self.datas.
 
         Returns:
             bool: Verdadero si se cumplen las condiciones de venta.
         """
         return True
         
+    def update_warming_up_datas(self):
+        """
+        Quita de la lista de datafeeds en calentamiento los que ya tienen suficientes velas. Solo se revisan los que todavía no
+        las tenían, por lo que una vez que todos las tienen no tiene costo.
+        """
+        self.warming_up_datas = [data for data in self.warming_up_datas if len(data) < self.warmup_period]
+
     def next(self):
         """
         Este método es la lógica principal de la estrategia, ejecutado en cada paso de cada datafeed. En caso de que no se cuente
@@ -111,22 +252,38 @@ class GeneralStrategy(bt.Strategy):
         IMPORTANTE: De esta forma solo se pueden vender activos comprados a través de la misma estrategia, porque no se puede
         vender si no hay posición, y tampoco podría ser negativa ya que se vende lo que se tiene en posición para ese activo en la estrategia.
         """
-        for data in self.datas:
-            position_data = self.assets_registry.get(data._name)
-            if position_data == 0 and self.conditions_buy(data):
-                vol = self.get_purchase_vol(data)
+        assets_registry = self.assets_registry  # Se guardan en variables locales los valores y métodos que se consultan para cada datafeed en cada paso
+        conditions_buy = self.conditions_buy
+        conditions_sell = self.conditions_sell
+        show_generated_order_log = GeneralStrategy.show_generated_order_log
+
+        if self.warming_up_datas:
+            self.update_warming_up_datas()
+            if self.warming_up_datas:
+                return  # Igual que hacía Backtrader con los indicadores, no se evalúa ningún datafeed hasta que todos completen el calentamiento
+
+        money_to_invest_cents = int(self.broker_value * self.investment_fraction * 100)  # Es el mismo para todas las compras del paso, porque el valor del portafolio no cambia hasta el siguiente
+        can_buy = self.has_funds_for(money_to_invest_cents)                             # Con el portafolio ya invertido no se evalúan las condiciones de compra, pero sí las de venta
+
+        for data_index, data in enumerate(self.datas):
+            position_data = assets_registry[data_index]
+            if position_data == 0 and can_buy and conditions_buy(data, data_index):
+                close = data.close[0]
+                price_cents = round(close * 100)
+                vol = self.get_purchase_vol(price_cents, money_to_invest_cents)
                 if vol > 0:
-                    GeneralStrategy.pending_operation_funds += vol * data.close[0] # Se reserva el dinero para la operación recién acá porque antes aún no se sabe si se va a generar la orden
-                    if GeneralStrategy.show_generated_order_log:
-                        self.add_log_entry('ORDEN DE COMPRA GENERADA, ACTIVO: %s, PRECIO: %.2f, CANTIDAD: %i' % 
-                            (data._name, data.close[0], vol), self.datas[0].datetime.date(0))
-                    self.buy(data=data._name, size=vol)
-
-            elif position_data > 0 and self.conditions_sell(data): # La verificación de posición ya impide que se venda si es 0, o sea que va a haber que comprar primero, y nunca se venderá algo que no se tiene
-                if GeneralStrategy.show_generated_order_log:
-                    self.add_log_entry('ORDEN DE VENTA GENERADA, ACTIVO: %s, PRECIO: %.2f, CANTIDAD: %i' % 
-                        (data._name, data.close[0], position_data), self.datas[0].datetime.date(0))
-                self.sell(data=data._name, size=position_data)  # Al vender lo que indica la posición respecto al activo en sí, que es
+                    reserved_cents = vol * price_cents
+                    GeneralStrategy.pending_operation_cents += reserved_cents # Se reserva el dinero para la operación recién acá porque antes aún no se sabe si se va a generar la orden
+                    if show_generated_order_log:
+                        self.add_log_entry(f'ORDEN DE COMPRA GENERADA, ACTIVO: {data._name}, PRECIO: {close:.2f}, CANTIDAD: {vol}')
+                    self.buy(data=data, size=vol).addinfo(reserved_cents=reserved_cents)   # Se pasa el datafeed directamente para que Backtrader no tenga que buscarlo por nombre,
+                                                                                            # y se guarda en la orden lo reservado para liberar exactamente eso cuando termine
+                    can_buy = self.has_funds_for(money_to_invest_cents)   # Solo cambia al reservar fondos
+
+            elif position_data > 0 and conditions_sell(data, data_index): # La verificación de posición ya impide que se venda si es 0, o sea que va a haber que comprar primero, y nunca se venderá algo que no se tiene
+                if show_generated_order_log:
+                    self.add_log_entry(f'ORDEN DE VENTA GENERADA, ACTIVO: {data._name}, PRECIO: {data.close[0]:.2f}, CANTIDAD: {position_data}')
+                self.sell(data=data, size=position_data)        # Al vender lo que indica la posición respecto al activo en sí, que es
                                                                 # independiente para cada estrategia, ya se impide que quede en una posición
                                                                 # negativa, cumpliendo con la restricción de que se vende a partir de la misma estrategia de compra y que solo se vende lo que se tiene,
                                                                 # porque cada estrategia vende lo que tiene en su posición
@@ -139,17 +296,14 @@ class GeneralStrategy(bt.Strategy):
         Args:
             order (Order): Objeto de orden.
         """
-        status_actions = {
-            order.Completed: self.handle_completed_order,
-            order.Canceled: self.handle_not_completed_order,
-            order.Margin: self.handle_not_completed_order,
-            order.Rejected: self.handle_not_completed_order,
-        }
-        
-        action = status_actions.get(order.status)
-        if action: # De este modo para los casos donde la orden tiene status Submitted o Accepted no se hace nada pero tampoco se la setea en None porque no se completó aun
-            action(order)
-            self.order = None
+        status = order.status
+        if status == order.Completed:
+            self.handle_completed_order(order)
+        elif status in GeneralStrategy.not_completed_statuses:
+            self.handle_not_completed_order(order)
+        else: return # De este modo para los casos donde la orden tiene status Submitted o Accepted no se hace nada pero tampoco se la setea en None porque no se completó aun
+
+        self.order = None
             
     def handle_completed_order(self, order):
         """
@@ -160,19 +314,21 @@ class GeneralStrategy(bt.Strategy):
             order (Order): Objeto de orden completada.
         """
         if order.isbuy():
-            GeneralStrategy.pending_operation_funds -= order.executed.size * order.data.close[0] # Al haberse completado la orden de compra se restan los fondos reservados para la misma
-            self.add_log_entry('COMPRA EJECUTADA CON ESTRATEGIA DE %s, ID: %i, ACTIVO: %s, PRECIO: %.2f, COSTO: %.2f, CANTIDAD: %i, %.2f%% DE LA CARTERA UTILIZADO' % 
-                (str(self), order.ref, order.data._name, order.executed.price, order.executed.value, order.executed.size, self.params.investment_fraction * 100), self.datas[0].datetime.date(0))
+            GeneralStrategy.pending_operation_cents -= order.info.reserved_cents # Al haberse completado la orden de compra se restan los fondos reservados para la misma
+            if self.log_file:   # Sin log ni siquiera se arma el mensaje
+                self.add_log_entry(f'COMPRA EJECUTADA CON ESTRATEGIA DE {self.strategy_label}, ID: {order.ref}, ACTIVO: {order.data._name}, PRECIO: {order.executed.price:.2f}, '
+                    f'COSTO: {order.executed.value:.2f}, CANTIDAD: {order.executed.size}, {self.investment_percentage} DE LA CARTERA UTILIZADO')
 
         elif order.issell():
-            self.add_log_entry('VENTA EJECUTADA CON ESTRATEGIA DE %s, ID: %i, ACTIVO: %s, PRECIO: %.2f, COSTO: %.2f, CANTIDAD: %i' % 
-                (str(self), order.ref, order.data._name, order.executed.price, order.executed.value, order.executed.size), self.datas[0].datetime.date(0))
+            if self.log_file:
+                self.add_log_entry(f'VENTA EJECUTADA CON ESTRATEGIA DE {self.strategy_label}, ID: {order.ref}, ACTIVO: {order.data._name}, PRECIO: {order.executed.price:.2f}, '
+                    f'COSTO: {order.executed.value:.2f}, CANTIDAD: {order.executed.size}')
         else: return # Si bien en este contexto no debería darse, hay otras posibilidades además de isbuy() y issell(), donde no debería ejecutarse la última línea
 
-        self.assets_registry[order.data._name] += order.executed.size   # Tanto si era una orden de compra como si era de venta, se
-                                                                        # hace la suma (porque si era una orden de compra se compró
-                                                                        # algo y la posición debe aumentar, y si era de venta se
-                                                                        # vendió algo, pero el size era negativo por lo que termina siendo una resta de la cantidad de activos vendidos)
+        self.assets_registry[self.data_indexes[order.data._name]] += order.executed.size    # Tanto si era una orden de compra como si era de venta, se
+                                                                                            # hace la suma (porque si era una orden de compra se compró
+                                                                                            # algo y la posición debe aumentar, y si era de venta se
+                                                                                            # vendió algo, pero el size era negativo por lo que termina siendo una resta de la cantidad de activos vendidos)
 
 
     def handle_not_completed_order(self, order):
@@ -184,13 +340,12 @@ class GeneralStrategy(bt.Strategy):
             order (Order): Objeto de orden no completada.
         """
         if order.isbuy():
-            amount_released = order.size * order.data.close[0]
-            GeneralStrategy.pending_operation_funds -= amount_released # Lo calculo antes para mostrar el dinero que libera la operación en el log
-            self.add_log_entry('ORDEN CANCELADA/MARGEN INSUFICIENTE/RECHAZADA, ID: %i, ACTIVO: %s, DINERO RESERVADO LIBERADO: %.2f' % 
-                (order.ref, order.data._name, amount_released), self.datas[0].datetime.date(0))
-        elif order.issell():
-            self.add_log_entry('ORDEN CANCELADA/MARGEN INSUFICIENTE/RECHAZADA, ID: %i, ACTIVO: %s' % 
-                (order.ref, order.data._name), self.datas[0].datetime.date(0))
+            cents_released = order.info.reserved_cents    # Es lo que se reservó al generar la orden, y no la cantidad por el cierre actual, que ya puede ser otro
+            GeneralStrategy.pending_operation_cents -= cents_released # Lo calculo antes para mostrar el dinero que libera la operación en el log
+            if self.log_file:
+                self.add_log_entry(f'ORDEN CANCELADA/MARGEN INSUFICIENTE/RECHAZADA, ID: {order.ref}, ACTIVO: {order.data._name}, DINERO RESERVADO LIBERADO: {cents_released / 100:.2f}')
+        elif order.issell() and self.log_file:
+            self.add_log_entry(f'ORDEN CANCELADA/MARGEN INSUFICIENTE/RECHAZADA, ID: {order.ref}, ACTIVO: {order.data._name}')
 
     def notify_trade(self, trade):
         """
@@ -200,9 +355,8 @@ class GeneralStrategy(bt.Strategy):
         Args:
             trade (Trade): Objeto de operación cerrada.
         """
-        if not trade.isclosed:
-            return
+        if not trade.isclosed or not self.log_file:
+            return  # Sin log tampoco hace falta valuar el portafolio
 
-        portfolio_value = self.broker.get_value()
-        self.add_log_entry('OPERACION CERRADA, ACTIVO: %s, UTILIDAD: %.2f, VALOR DE SALIDA DEL PORTAFOLIO: %.2f' % 
-                (trade.data._name, trade.pnl, portfolio_value), self.datas[0].datetime.date(0))
\ No newline at end of file
+        portfolio_value = self.broker_value_cache.get_value(len(self))
+        self.add_log_entry(f'OPERACION CERRADA, ACTIVO: {trade.data._name}, UTILIDAD: {trade.pnl:.2f}, VALOR DE SALIDA DEL PORTAFOLIO: {portfolio_value:.2f}')
\ No newline at end of file
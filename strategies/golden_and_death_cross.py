@@ -1,5 +1,6 @@
-import backtrader as bt
+import numpy as np
 from strategies.general_strategy import GeneralStrategy
+from strategies.kernels import compute_crossover, compute_sma_sums, get_simulate_crossover, to_cents
 
 class GoldenDeathCross(GeneralStrategy):
     """
@@ -9,14 +10,16 @@ class GoldenDeathCross(GeneralStrategy):
     Cross, lo que indica una posible tendencia alcista y se compra.
 
     Atributos:
-        smas_short_period (dict[bt.feeds.Data, bt.indicators.SimpleMovingAverage]): SMAs para el período corto (una por cada datafeed).
-        smas_long_period (dict[bt.feeds.Data, bt.indicators.SimpleMovingAverage]): SMAs para el período largo (una por cada datafeed).
+        crossovers (list[np.ndarray]): Para cada datafeed (en el mismo orden que self.datas), la posición de la SMA corta respecto de la larga en cada vela:
+            1 si está por encima, -1 si está por debajo y 0 si son iguales o alguna todavía no tiene la ventana completa.
 
     Args:
         short_period (int): El número de períodos para calcular la SMA corta, siendo que su valor por defecto es de 50.
         long_period (int): El número de períodos para calcular la SMA larga, siendo que su valor por defecto es de 200.
     """
 
+    __slots__ = ('crossovers',)
+
     params = (
         ('short_period', 10),
         ('long_period', 30),
@@ -24,20 +27,22 @@ class GoldenDeathCross(GeneralStrategy):
 
     def __init__(self):
         """
-        Para inicializar la estrategia y calcula las SMAs cortas y largas utilizando los períodos proporcionados
-        junto con el precio de cierre de los datos.
+        Para inicializar la estrategia y obtener las SMAs cortas y largas utilizando los períodos proporcionados
+        junto con el precio de cierre de los datos. Como las SMAs están precalculadas para toda la serie, la comparación entre
+        ambas también se hace una sola vez y de forma vectorizada, y en cada paso solo se consulta la vela actual.
         """
         super().__init__()
 
-        self.smas_short_period = {}
-        self.smas_long_period = {}
+        self.warmup_period = max(self.params.short_period, self.params.long_period)
+        self.crossovers = []
         
         for data in self.datas:
-            self.smas_short_period[data._name] = bt.indicators.SimpleMovingAverage(data.close, period=self.params.short_period)
-            self.smas_long_period[data._name] = bt.indicators.SimpleMovingAverage(data.close, period=self.params.long_period)
+            sma_short_sums = self.get_sma_sums(data, self.params.short_period)
+            sma_long_sums = self.get_sma_sums(data, self.params.long_period)
+            self.crossovers.append(compute_crossover(sma_short_sums, self.params.short_period, sma_long_sums, self.params.long_period))
 
     
-    def conditions_buy(self, data) -> bool:
+    def conditions_buy(self, data, data_index) -> bool:
         """
         Método que define las condiciones para ejecutar una orden de compra (implementación del método de la clase genérica de estrategia).
 
@@ -45,17 +50,18 @@ class GoldenDeathCross(GeneralStrategy):
 
         Args:
             data (bt.feeds.YahooFinanceCSVData): Objeto de datos de Yahoo Finance con la información del activo correspondiente.
+            data_index (int): Posición del datafeed en self.datas.
 
         Returns:
             bool: Verdadero si la SMA de corto plazo cruza hacia arriba la de largo plazo, lo que indica una señal de compra (por posible tendencia alcista).
         """
 
-        return self.smas_short_period[data._name][0] > self.smas_long_period[data._name][0] # No está la segunda condición porque en el contexto del problema
-                                                                                            # no se puede estar comprado y seguir comprando ya que antes se
-                                                                                            # verifica que no haya posición, por lo que está implícito
-                                                                                            # que en el candlestick previo la SMA corta no era mayor que la SMA larga.
+        return self.crossovers[data_index][len(data) - 1] > 0    # No está la segunda condición porque en el contexto del problema
+                                                                 # no se puede estar comprado y seguir comprando ya que antes se
+                                                                 # verifica que no haya posición, por lo que está implícito
+                                                                 # que en el candlestick previo la SMA corta no era mayor que la SMA larga.
     
-    def conditions_sell(self, data) -> bool:
+    def conditions_sell(self, data, data_index) -> bool:
         """
         Método que define las condiciones para ejecutar una orden de venta (implementación del método de la clase genérica de estrategia).
 
@@ -63,15 +69,45 @@ class GoldenDeathCross(GeneralStrategy):
 
         Args:
             data (bt.feeds.YahooFinanceCSVData): Objeto de datos de Yahoo Finance con la información del activo correspondiente.
+            data_index (int): Posición del datafeed en self.datas.
 
         Returns:
             bool: Verdadero si la SMA de corto plazo cruza hacia abajo la de largo plazo, lo que indica una señal de venta (por posible tendencia bajista).
         """
-        return self.smas_short_period[data._name][0] < self.smas_long_period[data._name][0] # No está la segunda condición porque en el contexto del problema
-                                                                                            # no se puede estar vendido y seguir vendiendo ya que antes se
-                                                                                            # verifica que haya una posición (que además no puede ser menor a 0),
-                                                                                            # por lo que está implícito que en el candlestick previo la SMA corta no era menor que la SMA larga. 
+        return self.crossovers[data_index][len(data) - 1] < 0    # No está la segunda condición porque en el contexto del problema
+                                                                 # no se puede estar vendido y seguir vendiendo ya que antes se
+                                                                 # verifica que haya una posición (que además no puede ser menor a 0),
+                                                                 # por lo que está implícito que en el candlestick previo la SMA corta no era menor que la SMA larga.
     
+    @classmethod
+    def fast_backtest(cls, opens, closes, short_period=10, long_period=30, investment_fraction=0.1, cash=100000.0):
+        """
+        Simula la estrategia sobre un único activo sin pasar por cerebro: las SMAs y la señal se calculan de forma vectorizada y
+        la evolución del efectivo con el kernel de simulación (compilado por Numba si está instalado). Está pensada para barrer
+        parámetros rápidamente; el resultado coincide con el de cerebro cuando la estrategia opera sola sobre ese activo, pero no
+        contempla otras estrategias o activos compartiendo el broker, por lo que la simulación con Backtrader sigue siendo la referencia.
+
+        Args:
+            opens (Sequence[float]): Precios de apertura del activo.
+            closes (Sequence[float]): Precios de cierre del activo.
+            short_period (int): El número de períodos de la SMA corta.
+            long_period (int): El número de períodos de la SMA larga.
+            investment_fraction (float): Fracción del portafolio a invertir en cada compra.
+            cash (float): Capital inicial.
+
+        Returns:
+            tuple[float, list[tuple]]: Valor final del portafolio y las operaciones cerradas, cada una como (vela de compra, vela de
+                venta, cantidad, precio de compra, precio de venta, utilidad).
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if len(closes) == 0:
+            return cash, []
+        closes_cents = to_cents(closes)
+        crossover = compute_crossover(compute_sma_sums(closes_cents, short_period), short_period, compute_sma_sums(closes_cents, long_period), long_period)
+        final_value, trades_count, trade_bars, trade_prices = get_simulate_crossover()(np.asarray(opens, dtype=np.float64), closes, crossover, investment_fraction, cash)
+
+        return final_value, [(*bars, *prices) for bars, prices in zip(trade_bars[:trades_count].tolist(), trade_prices[:trades_count].tolist())]
+
     def __str__(self) -> str:
         """
         Devuelve una representación en cadena de la estrategia, mostrando los períodos de las SMA corta y larga utilizadas.
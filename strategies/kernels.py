@@ -0,0 +1,142 @@
+from functools import lru_cache
+import numpy as np
+
+def to_cents(prices):
+    """
+    Convierte precios a centavos enteros. Como los precios de los datafeeds están redondeados a 2 decimales, la conversión es
+    exacta, y a partir de ahí las sumas y comparaciones no acumulan error de redondeo.
+
+    Args:
+        prices (Sequence[float]): Precios del activo.
+
+    Returns:
+        np.ndarray: Precios en centavos (int64).
+    """
+    return np.rint(np.asarray(prices, dtype=np.float64) * 100).astype(np.int64)
+
+def compute_sma_sums(closes_cents, period):
+    """
+    Calcula para cada vela la suma de los cierres de las últimas period velas, o sea la SMA multiplicada por el período, a
+    partir de la suma acumulada en enteros. Al ser exacta, una serie de precios constante da una SMA exactamente igual al
+    precio (como la SMA de Backtrader, que suma con math.fsum).
+
+    Args:
+        closes_cents (np.ndarray): Precios de cierre del activo en centavos (int64).
+        period (int): El número de períodos de la SMA.
+
+    Returns:
+        np.ndarray: Suma de la ventana de cada vela en centavos (int64), con 0 en las primeras period - 1 velas (donde la ventana
+            no está completa).
+    """
+    sums = np.zeros(len(closes_cents), dtype=np.int64)
+    if len(closes_cents) >= period:
+        csum = np.concatenate(([0], np.cumsum(closes_cents, dtype=np.int64)))
+        sums[period - 1:] = csum[period:] - csum[:-period]
+    return sums
+
+def compute_price_signal(closes_cents, sma_sums, period):
+    """
+    Calcula la posición del precio de cierre respecto de su SMA en cada vela, comparando cierre * período con la suma de la
+    ventana para no tener que dividir.
+
+    Args:
+        closes_cents (np.ndarray): Precios de cierre del activo en centavos (int64).
+        sma_sums (np.ndarray): Sumas de la ventana de la SMA en centavos, como las devuelve compute_sma_sums.
+        period (int): El número de períodos de la SMA.
+
+    Returns:
+        np.ndarray: Array int8 con 1 si el cierre está por encima de la SMA, -1 si está por debajo y 0 si son iguales o la SMA
+            todavía no tiene la ventana completa, por lo que en ese caso no se opera.
+    """
+    signal = np.sign(closes_cents * period - sma_sums).astype(np.int8)
+    signal[:period - 1] = 0
+    return signal
+
+def compute_crossover(sma_short_sums, short_period, sma_long_sums, long_period):
+    """
+    Calcula la posición de una SMA corta respecto de una larga en cada vela. Para compararlas sin dividir se multiplica la suma
+    de cada ventana por el período de la otra.
+
+    Args:
+        sma_short_sums (np.ndarray): Sumas de la ventana de la SMA corta en centavos, como las devuelve compute_sma_sums.
+        short_period (int): El número de períodos de la SMA corta.
+        sma_long_sums (np.ndarray): Sumas de la ventana de la SMA larga en centavos.
+        long_period (int): El número de períodos de la SMA larga.
+
+    Returns:
+        np.ndarray: Array int8 con 1 si la SMA corta está por encima, -1 si está por debajo y 0 si son iguales o alguna todavía
+            no tiene la ventana completa, por lo que en ese caso no se opera.
+    """
+    signal = np.sign(sma_short_sums * long_period - sma_long_sums * short_period).astype(np.int8)
+    signal[:max(short_period, long_period) - 1] = 0
+    return signal
+
+def simulate_crossover_loop(opens, closes, crossover, investment_fraction, cash):
+    """
+    Simula de punta a punta una estrategia de un único activo que compra cuando la señal es positiva y vende cuando es negativa,
+    con las mismas reglas que GeneralStrategy: sin posición se compra la fracción del portafolio indicada (solo si el efectivo
+    alcanza), con posición se vende todo, y las órdenes de mercado se ejecutan al precio de apertura de la vela siguiente.
+
+    Args:
+        opens (np.ndarray): Precios de apertura del activo (float64).
+        closes (np.ndarray): Precios de cierre del activo (float64).
+        crossover (np.ndarray): Señal de cada vela (positiva para comprar, negativa para vender).
+        investment_fraction (float): Fracción del portafolio a invertir en cada compra.
+        cash (float): Capital inicial.
+
+    Returns:
+        tuple: Valor final del portafolio, cantidad de operaciones cerradas, un array de enteros con (vela de compra, vela de venta,
+            cantidad) y otro con (precio de compra, precio de venta, utilidad) por cada operación, de los cuales solo son válidas
+            las primeras filas.
+    """
+    n = len(closes)
+    trade_bars = np.zeros((n, 3), dtype=np.int64)
+    trade_prices = np.zeros((n, 3))
+    trades_count = 0
+    position = 0
+    pending = 0     # Cantidad de la orden pendiente de ejecución (positiva si es de compra y negativa si es de venta)
+    entry_index = 0
+    entry_price = 0.0
+    for i in range(n):
+        if pending > 0:
+            cost = pending * opens[i]
+            if cost <= cash:    # Si no alcanza el efectivo el broker la rechaza por margen
+                cash -= cost
+                position = pending
+                entry_index = i
+                entry_price = opens[i]
+        elif pending < 0:
+            cash += position * opens[i]
+            trade_bars[trades_count, 0] = entry_index
+            trade_bars[trades_count, 1] = i
+            trade_bars[trades_count, 2] = position
+            trade_prices[trades_count, 0] = entry_price
+            trade_prices[trades_count, 1] = opens[i]
+            trade_prices[trades_count, 2] = position * (opens[i] - entry_price)
+            trades_count += 1
+            position = 0
+        pending = 0
+
+        if position == 0 and crossover[i] > 0:
+            money_to_invest_cents = int(cash * investment_fraction * 100)    # Sin posición el valor del portafolio es el efectivo. En centavos, igual que en GeneralStrategy
+            if money_to_invest_cents <= round(cash * 100):
+                pending = money_to_invest_cents // round(closes[i] * 100)
+        elif position > 0 and crossover[i] < 0:
+            pending = -position
+
+    return cash + position * closes[n - 1], trades_count, trade_bars, trade_prices
+
+@lru_cache(maxsize=None)
+def get_simulate_crossover():
+    """
+    Devuelve simulate_crossover_loop compilado con Numba si está instalado, o la versión en Python si no. Numba se importa
+    recién acá, la primera vez que se simula sin cerebro, para que la simulación normal no pague el costo de importarlo.
+
+    Returns:
+        Callable: Función con la misma firma que simulate_crossover_loop.
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return simulate_crossover_loop
+    return njit(cache=True)(simulate_crossover_loop)
@@ -0,0 +1,100 @@
+import atexit
+import queue
+import threading
+
+class LogWriter:
+    """
+    Archivo de log compartido por todas las estrategias que escriben en la misma ruta. Las entradas se encolan y un hilo aparte
+    las escribe en el archivo en bloques, por lo que la simulación no espera a que se hagan las escrituras. Como la cola es una
+    sola por archivo y la vacía un único hilo, los registros de las distintas estrategias quedan en el mismo orden en que se
+    generaron.
+
+    Atributos de clase:
+        chunk_entries (int): Cantidad máxima de entradas que el hilo escribe juntas en una única escritura.
+        writers (dict[str, LogWriter]): Archivos de log abiertos, indexados por su ruta.
+
+    Atributos:
+        path (str): Ruta al archivo de log.
+        file (file): Archivo de log abierto en modo append.
+        queue (queue.SimpleQueue): Entradas pendientes de escribir, terminadas con None cuando se cierra el log.
+        thread (threading.Thread): Hilo que vacía la cola en el archivo.
+        users (int): Cantidad de estrategias que tienen abierto el archivo.
+    """
+
+    chunk_entries = 1024
+
+    writers = {}
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', buffering=1 << 20)
+        self.queue = queue.SimpleQueue()
+        self.users = 0
+        self.thread = threading.Thread(target=self.drain, name=f'LogWriter({path})', daemon=True)
+        self.thread.start()
+        atexit.register(self.finish)  # Por si la simulación se interrumpe antes de que las estrategias cierren el log
+
+    @classmethod
+    def open(cls, path) -> 'LogWriter':
+        """
+        Devuelve el log de la ruta indicada, abriéndolo si ninguna estrategia lo tenía abierto.
+
+        Args:
+            path (str): Ruta al archivo de log.
+
+        Returns:
+            LogWriter: Log compartido de esa ruta.
+        """
+        writer = cls.writers.get(path)
+        if writer is None:
+            writer = cls.writers[path] = cls(path)
+        writer.users += 1
+        return writer
+
+    def write(self, line):
+        """
+        Encola una entrada para que la escriba el hilo del log.
+
+        Args:
+            line (str): Entrada a registrar, incluyendo el salto de línea.
+        """
+        self.queue.put(line)
+
+    def drain(self):
+        """
+        Ejecutado por el hilo del log: espera entradas y escribe juntas todas las que ya estén encoladas (hasta chunk_entries)
+        con una única escritura, hasta recibir None.
+        """
+        finished = False
+        while not finished:
+            chunk = [self.queue.get()]
+            while len(chunk) < self.chunk_entries:
+                try:
+                    chunk.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if chunk[-1] is None:   # Es siempre la última entrada, porque después de cerrar el log ya no se escribe
+                chunk.pop()
+                finished = True
+            self.file.write(''.join(chunk))
+        self.file.flush()
+
+    def finish(self):
+        """
+        Espera a que el hilo escriba todas las entradas encoladas y cierra el archivo.
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.file.close()
+
+    def close(self):
+        """
+        Libera el log para una estrategia. Cuando ya no lo usa ninguna, escribe lo pendiente y cierra el archivo.
+        """
+        self.users -= 1
+        if self.users > 0:
+            return
+        self.finish()
+        atexit.unregister(self.finish)
+        del LogWriter.writers[self.path]